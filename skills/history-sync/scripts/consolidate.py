@@ -14,17 +14,14 @@ Creates a directory structure like:
 """
 
 import os
+import hashlib
 import shutil
+from collections import Counter
 from pathlib import Path
 from typing import Optional
 from discover import discover_all, DiscoveryResult, get_hostname
 
-
-def ensure_gitignore(consolidated_dir: Path):
-    """Ensure the consolidated directory has a .gitignore that ignores remote data."""
-    gitignore_path = consolidated_dir / ".gitignore"
-
-    gitignore_content = """\
+_GITIGNORE_CONTENT = b"""\
 # Ignore remote history data (actual files, not symlinks)
 # Keep symlinks for local histories
 
@@ -40,16 +37,80 @@ def ensure_gitignore(consolidated_dir: Path):
 *.tar.gz
 *.zip
 
+# Local consolidation state
+.sync-state
+
 # Common patterns to ignore
 *.pyc
 __pycache__/
 .DS_Store
 """
 
-    gitignore_path.write_text(gitignore_content)
+_GITIGNORE_DIGEST = hashlib.blake2b(_GITIGNORE_CONTENT, digest_size=16).hexdigest()
+
+# Records the last consolidated layout so unchanged runs can skip all work
+STATE_FILE = ".sync-state"
+
+
+def discovery_fingerprint(discovery: DiscoveryResult) -> str:
+    """Fingerprint the parts of a discovery result that consolidation depends on."""
+    h = hashlib.blake2b(digest_size=16)
+    h.update(
+        f"{discovery.hostname}|{discovery.claude_code_base}|{discovery.cursor_base}"
+        f"|{_GITIGNORE_DIGEST}".encode()
+    )
+    return h.hexdigest()
+
+
+def link_points_to(link: Path, target: Path) -> bool:
+    """Check that link is a symlink whose stored target is exactly target."""
+    try:
+        return os.readlink(link) == str(target)
+    except OSError:
+        return False
+
+
+def layout_present(consolidated_dir: Path, discovery: DiscoveryResult) -> bool:
+    """Check that .gitignore exists and every local link points at its discovered base."""
+    if not os.path.lexists(consolidated_dir / ".gitignore"):
+        return False
+
+    host_dir = consolidated_dir / discovery.hostname
+    expected = []
+    if discovery.claude_code_base:
+        expected.append((host_dir / "claude-code", discovery.claude_code_base))
+    if discovery.cursor_base:
+        expected.append((host_dir / "cursor", discovery.cursor_base))
+    return all(link_points_to(link, target) for link, target in expected)
+
+
+def ensure_gitignore(consolidated_dir: Path):
+    """Ensure the consolidated directory has a .gitignore that ignores remote data."""
+    gitignore_path = consolidated_dir / ".gitignore"
+
+    if gitignore_path.exists() and gitignore_path.read_bytes() == _GITIGNORE_CONTENT:
+        return
+
+    gitignore_path.write_bytes(_GITIGNORE_CONTENT)
     print(f"Created .gitignore at {gitignore_path}")
 
 
+def link_local(link: Path, target: Path, force: bool = False):
+    """Symlink link to target, replacing an existing entry only if force is set."""
+    # A single lstat; unlike exists() this also catches dangling symlinks
+    present = os.path.lexists(link)
+    if present:
+        if force:
+            link.unlink()
+            present = False
+        else:
+            print(f"  Skipping {link} (already exists)")
+
+    if not present:
+        link.symlink_to(target)
+        print(f"  Created symlink: {link} -> {target}")
+
+
 def consolidate_local(
     consolidated_dir: Path,
     discovery: DiscoveryResult,
@@ -65,29 +126,11 @@ def consolidate_local(
 
     # Create symlink for Claude Code
     if discovery.claude_code_base:
-        claude_link = host_dir / "claude-code"
-        if claude_link.exists() or claude_link.is_symlink():
-            if force:
-                claude_link.unlink()
-            else:
-                print(f"  Skipping {claude_link} (already exists)")
-
-        if not claude_link.exists() and not claude_link.is_symlink():
-            claude_link.symlink_to(discovery.claude_code_base)
-            print(f"  Created symlink: {claude_link} -> {discovery.claude_code_base}")
+        link_local(host_dir / "claude-code", discovery.claude_code_base, force)
 
     # Create symlink for Cursor
     if discovery.cursor_base:
-        cursor_link = host_dir / "cursor"
-        if cursor_link.exists() or cursor_link.is_symlink():
-            if force:
-                cursor_link.unlink()
-            else:
-                print(f"  Skipping {cursor_link} (already exists)")
-
-        if not cursor_link.exists() and not cursor_link.is_symlink():
-            cursor_link.symlink_to(discovery.cursor_base)
-            print(f"  Created symlink: {cursor_link} -> {discovery.cursor_base}")
+        link_local(host_dir / "cursor", discovery.cursor_base, force)
 
     return host_dir
 
@@ -115,6 +158,8 @@ def consolidate(
     Main consolidation function.
 
     Creates the consolidated directory structure with symlinks for local histories.
+    If nothing changed since the last run and its entries are still on disk
+    (and force is not set), returns without rebuilding.
     Returns the path to the consolidated directory.
     """
     output_dir = output_dir or Path.home() / ".history-sync"
@@ -123,15 +168,33 @@ def consolidate(
     print(f"\nConsolidating histories to: {output_dir}")
     print("-" * 50)
 
-    # Ensure .gitignore exists
-    ensure_gitignore(output_dir)
-
     # Discover local histories
     discovery = discover_all()
 
+    state_path = output_dir / STATE_FILE
+    fingerprint = discovery_fingerprint(discovery)
+    if (
+        not force
+        and state_path.exists()
+        and state_path.read_text() == fingerprint
+        and layout_present(output_dir, discovery)
+    ):
+        print("\nAlready up to date (use --force to rebuild)")
+        return output_dir
+
+    # Ensure .gitignore exists
+    ensure_gitignore(output_dir)
+
     print(f"\nLocal host: {discovery.hostname}")
     consolidate_local(output_dir, discovery, force)
 
+    # Only record the layout once it is actually in place; if an existing
+    # entry was skipped, keep checking (and warning) on later runs
+    if layout_present(output_dir, discovery):
+        state_path.write_text(fingerprint)
+    else:
+        state_path.unlink(missing_ok=True)
+
     print(f"\nConsolidation complete!")
     print(f"View histories at: {output_dir}")
 
@@ -150,18 +213,45 @@ def list_consolidated(consolidated_dir: Path = None):
     print(f"\nConsolidated Histories: {consolidated_dir}")
     print("=" * 60)
 
-    for host_dir in sorted(consolidated_dir.iterdir()):
-        if host_dir.is_dir():
-            print(f"\n{host_dir.name}/")
-
-            for tool_dir in sorted(host_dir.iterdir()):
-                if tool_dir.is_symlink():
-                    target = tool_dir.resolve()
-                    print(f"  {tool_dir.name} -> {target} (symlink)")
-                elif tool_dir.is_dir():
-                    # Count files for remote directories
-                    file_count = sum(1 for _ in tool_dir.rglob("*") if _.is_file())
-                    print(f"  {tool_dir.name}/ ({file_count} files)")
+    # Host entries may themselves be symlinks to directories, like the
+    # baseline iterdir() listing
+    with os.scandir(consolidated_dir) as entries:
+        hosts = sorted(entry.name for entry in entries if entry.is_dir())
+
+    # One traversal per host: record its tool entries and tally files under
+    # every tool. os.walk follows the host path itself even if it is a link.
+    tools = {}
+    file_counts = Counter()
+    for host in hosts:
+        host_path = os.path.join(consolidated_dir, host)
+        for root, dirs, files in os.walk(host_path):
+            rel = os.path.relpath(root, host_path)
+            if rel == os.curdir:
+                entries = []
+                for name in sorted(dirs + files):
+                    path = os.path.join(root, name)
+                    if os.path.islink(path):
+                        entries.append((name, os.path.realpath(path)))
+                    elif name in dirs:
+                        entries.append((name, None))
+                tools[host] = entries
+            else:
+                file_counts[host, rel.split(os.sep, 1)[0]] += len(files)
+
+    for host in hosts:
+        print(f"\n{host}/")
+
+        # os.walk skips directories it cannot list, so tools is unset then
+        if host not in tools:
+            print("  (unreadable)")
+            continue
+
+        for tool, target in tools[host]:
+            if target is not None:
+                print(f"  {tool} -> {target} (symlink)")
+            else:
+                # Count files for remote directories
+                print(f"  {tool}/ ({file_counts[host, tool]} files)")
 
 
 if __name__ == "__main__":
@@ -4,12 +4,34 @@ Discover Claude Code and Cursor history locations on local or remote machines.
 """
 
 import os
+import sys
 import json
 import hashlib
+import functools
 from pathlib import Path
 from dataclasses import dataclass, field
 from typing import Optional
 
+# Resolved once; Path.home() consults the environment/passwd database each call
+_HOME = Path.home()
+
+# Cursor layouts keyed by sys.platform, as (base dir relative to home,
+# User dir relative to base)
+_CURSOR_LAYOUTS = {
+    "linux": (
+        (Path(".config") / "Cursor", Path("User")),  # Linux desktop
+        (Path(".cursor-server"), Path("data") / "User"),  # Linux server/remote
+    ),
+    "darwin": (
+        (Path("Library") / "Application Support" / "Cursor", Path("User")),  # macOS
+    ),
+}
+# Unknown platforms fall back to trying every layout
+_CURSOR_ROOTS = _CURSOR_LAYOUTS.get(
+    sys.platform,
+    tuple(root for roots in _CURSOR_LAYOUTS.values() for root in roots)
+)
+
 
 @dataclass
 class HistoryLocation:
@@ -20,6 +42,7 @@ class HistoryLocation:
     session_count: int = 0
     is_remote: bool = False
     host: Optional[str] = None
+    base: Optional[Path] = None  # Tool base directory this location belongs to
 
 
 @dataclass
@@ -31,15 +54,30 @@ class DiscoveryResult:
     locations: list = field(default_factory=list)
 
 
+@functools.lru_cache(maxsize=1)
 def get_hostname() -> str:
     """Get the current machine's hostname."""
     import socket
     return socket.gethostname()
 
 
+def count_lines(path: Path) -> int:
+    """Count lines in a file by scanning raw bytes for newlines."""
+    count = 0
+    last = b"\n"
+    with open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            count += chunk.count(b"\n")
+            last = chunk[-1:]
+    # A final line without a trailing newline still counts
+    if last != b"\n":
+        count += 1
+    return count
+
+
 def discover_claude_code(home: Path = None) -> list[HistoryLocation]:
     """Discover Claude Code history locations."""
-    home = home or Path.home()
+    home = home or _HOME
     locations = []
 
     claude_base = home / ".claude"
@@ -53,26 +91,34 @@ def discover_claude_code(home: Path = None) -> list[HistoryLocation]:
             tool="claude-code",
             path=history_file,
             project_name="_index",
-            session_count=sum(1 for _ in open(history_file))
+            session_count=count_lines(history_file)
         ))
 
     # Project-specific histories
     projects_dir = claude_base / "projects"
     if projects_dir.exists():
-        for project_dir in projects_dir.iterdir():
-            if project_dir.is_dir() and not project_dir.name.startswith('.'):
+        with os.scandir(projects_dir) as entries:
+            for project_entry in entries:
+                if project_entry.name.startswith('.') or not project_entry.is_dir(follow_symlinks=False):
+                    continue
+
                 # Decode project name from directory name
-                project_name = project_dir.name.replace('-', '/')
+                project_name = project_entry.name.replace('-', '/')
                 if project_name.startswith('/'):
                     project_name = project_name[1:]
 
-                session_files = list(project_dir.glob("*.jsonl"))
-                if session_files:
+                session_count = 0
+                with os.scandir(project_entry.path) as session_entries:
+                    for session_entry in session_entries:
+                        if session_entry.name.endswith(".jsonl") and session_entry.is_file(follow_symlinks=False):
+                            session_count += 1
+
+                if session_count:
                     locations.append(HistoryLocation(
                         tool="claude-code",
-                        path=project_dir,
+                        path=Path(project_entry.path),
                         project_name=project_name,
-                        session_count=len(session_files)
+                        session_count=session_count
                     ))
 
     return locations
@@ -80,61 +126,57 @@ def discover_claude_code(home: Path = None) -> list[HistoryLocation]:
 
 def discover_cursor(home: Path = None) -> list[HistoryLocation]:
     """Discover Cursor history locations."""
-    home = home or Path.home()
+    home = home or _HOME
     locations = []
 
-    # Check multiple possible Cursor locations
-    cursor_paths = [
-        home / ".config" / "Cursor" / "User" / "workspaceStorage",  # Linux desktop
-        home / ".cursor-server" / "data" / "User" / "workspaceStorage",  # Linux server/remote
-        home / "Library" / "Application Support" / "Cursor" / "User" / "workspaceStorage",  # macOS
-    ]
-
-    for ws_path in cursor_paths:
-        if ws_path.exists():
-            for workspace_dir in ws_path.iterdir():
-                if workspace_dir.is_dir():
-                    # Look for state.vscdb or other chat data
-                    state_db = workspace_dir / "state.vscdb"
-                    if state_db.exists():
-                        locations.append(HistoryLocation(
-                            tool="cursor",
-                            path=workspace_dir,
-                            project_name=workspace_dir.name[:12] + "...",  # Hash prefix
-                            session_count=1
-                        ))
-                    else:
-                        # Still track the workspace even without state.vscdb
-                        locations.append(HistoryLocation(
-                            tool="cursor",
-                            path=workspace_dir,
-                            project_name=workspace_dir.name[:12] + "...",
-                            session_count=0
-                        ))
-
-    # Also check for Cursor's file history
-    history_paths = [
-        home / ".cursor-server" / "data" / "User" / "History",
-        home / ".config" / "Cursor" / "User" / "History",
-    ]
+    # Only check the Cursor layouts that apply to this platform
+    cursor_bases = [(home / base, home / base / user) for base, user in _CURSOR_ROOTS]
+
+    for base, user_dir in cursor_bases:
+        ws_path = user_dir / "workspaceStorage"
+        try:
+            entries = os.scandir(ws_path)
+        except FileNotFoundError:
+            continue
+        with entries:
+            for workspace_entry in entries:
+                if workspace_entry.is_dir():
+                    # Look for state.vscdb or other chat data; workspaces
+                    # without it are still tracked with no sessions
+                    has_state = os.path.isfile(os.path.join(workspace_entry.path, "state.vscdb"))
+                    locations.append(HistoryLocation(
+                        tool="cursor",
+                        path=Path(workspace_entry.path),
+                        project_name=workspace_entry.name[:12] + "...",  # Hash prefix
+                        session_count=1 if has_state else 0,
+                        base=base
+                    ))
 
-    for hist_path in history_paths:
-        if hist_path.exists():
-            history_dirs = [d for d in hist_path.iterdir() if d.is_dir()]
-            if history_dirs:
-                locations.append(HistoryLocation(
-                    tool="cursor",
-                    path=hist_path,
-                    project_name="_file_history",
-                    session_count=len(history_dirs)
-                ))
+    # Also check for Cursor's file history; server layouts take precedence
+    # here, so walk the layouts in reverse (.cursor-server before .config)
+    for base, user_dir in reversed(cursor_bases):
+        hist_path = user_dir / "History"
+        try:
+            entries = os.scandir(hist_path)
+        except FileNotFoundError:
+            continue
+        with entries:
+            history_count = sum(1 for entry in entries if entry.is_dir())
+        if history_count:
+            locations.append(HistoryLocation(
+                tool="cursor",
+                path=hist_path,
+                project_name="_file_history",
+                session_count=history_count,
+                base=base
+            ))
 
     return locations
 
 
 def discover_all(home: Path = None) -> DiscoveryResult:
     """Discover all history locations."""
-    home = home or Path.home()
+    home = home or _HOME
     hostname = get_hostname()
 
     claude_locations = discover_claude_code(home)
@@ -147,48 +189,47 @@ def discover_all(home: Path = None) -> DiscoveryResult:
         locations=claude_locations + cursor_locations
     )
 
-    # Set cursor base if found
-    for loc in cursor_locations:
-        if loc.path.exists():
-            # Find the base cursor directory
-            path_str = str(loc.path)
-            if ".cursor-server" in path_str:
-                result.cursor_base = home / ".cursor-server"
-            elif ".config/Cursor" in path_str:
-                result.cursor_base = home / ".config" / "Cursor"
-            break
+    # Cursor base comes from the first match, tagged during discovery
+    if cursor_locations:
+        result.cursor_base = cursor_locations[0].base
 
     return result
 
 
 def print_discovery_report(result: DiscoveryResult):
     """Print a human-readable discovery report."""
-    print(f"\n{'='*60}")
-    print(f"History Discovery Report - {result.hostname}")
-    print(f"{'='*60}\n")
+    # Build the whole report first and write it once
+    lines = [
+        f"\n{'='*60}",
+        f"History Discovery Report - {result.hostname}",
+        f"{'='*60}\n",
+    ]
 
     claude_locs = [l for l in result.locations if l.tool == "claude-code"]
     cursor_locs = [l for l in result.locations if l.tool == "cursor"]
 
     if result.claude_code_base:
-        print(f"Claude Code Base: {result.claude_code_base}")
-        print(f"  Found {len(claude_locs)} location(s):")
+        lines.append(f"Claude Code Base: {result.claude_code_base}")
+        lines.append(f"  Found {len(claude_locs)} location(s):")
         for loc in claude_locs:
-            print(f"    - {loc.project_name}: {loc.session_count} session(s)")
+            lines.append(f"    - {loc.project_name}: {loc.session_count} session(s)")
     else:
-        print("Claude Code: Not found")
+        lines.append("Claude Code: Not found")
 
-    print()
+    lines.append("")
 
     if result.cursor_base:
-        print(f"Cursor Base: {result.cursor_base}")
-        print(f"  Found {len(cursor_locs)} location(s):")
+        lines.append(f"Cursor Base: {result.cursor_base}")
+        lines.append(f"  Found {len(cursor_locs)} location(s):")
         for loc in cursor_locs:
-            print(f"    - {loc.project_name}: {loc.session_count} session(s)")
+            lines.append(f"    - {loc.project_name}: {loc.session_count} session(s)")
     else:
-        print("Cursor: Not found")
+        lines.append("Cursor: Not found")
+
+    lines.append("")
 
-    print()
+    sys.stdout.write("\n".join(lines) + "\n")
+    sys.stdout.flush()
 
 
 def to_json(result: DiscoveryResult) -> dict:
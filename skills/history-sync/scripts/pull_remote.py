@@ -5,12 +5,46 @@ Pull Claude Code and Cursor histories from remote machines.
 Uses rsync over SSH to efficiently sync history directories.
 """
 
+import functools
+import io
+import re
 import subprocess
 import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
-from typing import Optional
+from typing import Optional, TextIO
 from dataclasses import dataclass
 
+# Upper bound on concurrent hosts in pull_from_multiple
+MAX_PARALLEL_HOSTS = 8
+
+# Share one SSH connection between discovery and rsync for each host.
+# %C is a hash of the connection details, which keeps the socket path short
+# enough for the unix socket limit even with long user/host names.
+SSH_MULTIPLEX_OPTIONS = [
+    "-o", "ControlMaster=auto",
+    "-o", "ControlPath=~/.ssh/cm-%C",
+    "-o", "ControlPersist=60s",
+]
+
+# Captured SSH commands must never wait on a prompt or fill the pipe with
+# banners: fail instead of prompting, and only log errors
+SSH_BATCH_OPTIONS = [
+    "-o", "BatchMode=yes",
+    "-o", "LogLevel=ERROR",
+    "-o", "StrictHostKeyChecking=accept-new",
+]
+
+# Candidate history directories on remote hosts, in order of preference
+REMOTE_CLAUDE_PATHS = [
+    "~/.claude"
+]
+REMOTE_CURSOR_PATHS = [
+    "~/.cursor-server",
+    "~/.config/Cursor",
+    "~/.cursor"
+]
+
 
 @dataclass
 class RemoteHost:
@@ -26,9 +60,9 @@ class RemoteHost:
             self.ssh_host = f"{self.user}@{self.hostname}" if self.user else self.hostname
 
 
-def run_ssh_command(host: RemoteHost, command: str) -> tuple[int, str, str]:
-    """Run a command on a remote host via SSH."""
-    ssh_args = ["ssh"]
+def ssh_options(host: RemoteHost) -> list[str]:
+    """Build the ssh command (without destination) used for a remote host."""
+    ssh_args = ["ssh", *SSH_MULTIPLEX_OPTIONS]
 
     if host.port != 22:
         ssh_args.extend(["-p", str(host.port)])
@@ -36,10 +70,18 @@ def run_ssh_command(host: RemoteHost, command: str) -> tuple[int, str, str]:
     if host.identity_file:
         ssh_args.extend(["-i", str(host.identity_file)])
 
+    return ssh_args
+
+
+def run_ssh_command(host: RemoteHost, command: str) -> tuple[int, str, str]:
+    """Run a command on a remote host via SSH."""
+    ssh_args = ssh_options(host)
+    ssh_args.extend(SSH_BATCH_OPTIONS)
     ssh_args.extend([host.ssh_host, command])
 
     result = subprocess.run(
         ssh_args,
+        stdin=subprocess.DEVNULL,
         capture_output=True,
         text=True
     )
@@ -47,34 +89,69 @@ def run_ssh_command(host: RemoteHost, command: str) -> tuple[int, str, str]:
     return result.returncode, result.stdout, result.stderr
 
 
+@functools.lru_cache(maxsize=1)
+def rsync_supports_info() -> bool:
+    """Whether the local rsync accepts --info (rsync 3.1+; not macOS's 2.6.9/openrsync)."""
+    try:
+        result = subprocess.run(["rsync", "--version"], capture_output=True, text=True)
+    except OSError:
+        return False
+
+    match = re.search(r"version (\d+)\.(\d+)", result.stdout)
+    return bool(match) and (int(match.group(1)), int(match.group(2))) >= (3, 1)
+
+
 def rsync_remote_dir(
     host: RemoteHost,
     remote_path: str,
     local_path: Path,
-    dry_run: bool = False
+    dry_run: bool = False,
+    out: Optional[TextIO] = None,
+    verbose: Optional[bool] = None,
+    compress: bool = False
 ) -> bool:
     """
     Rsync a directory from remote host to local.
 
+    If out is given, rsync output is captured and written there instead of
+    going straight to the terminal. Per-file output is only produced when
+    verbose is set; by default that is when writing directly to a terminal.
+
+    History is mostly small, append-only JSONL files, so files are copied
+    whole rather than delta-encoded, and compression is opt-in for slow links.
+
     Returns True if successful.
     """
     local_path.mkdir(parents=True, exist_ok=True)
 
+    if verbose is None:
+        verbose = out is None and sys.stdout.isatty()
+
     rsync_args = [
         "rsync",
-        "-avz",  # archive, verbose, compress
-        "--progress",
+        "-a",  # archive
         "--delete",  # Remove files that don't exist on remote
+        "--no-motd",
+        "--whole-file",  # Skip delta computation for small files
     ]
 
+    if compress:
+        rsync_args.append("-z")
+
+    if verbose:
+        rsync_args.extend(["-v", "--progress"])
+    elif rsync_supports_info():
+        if out is None and sys.stdout.isatty():
+            # One overall progress line plus summary stats
+            rsync_args.append("--info=stats1,progress2")
+        else:
+            # Logs and captured output have no use for carriage-return updates
+            rsync_args.append("--info=stats1")
+
     if dry_run:
         rsync_args.append("--dry-run")
 
-    if host.port != 22:
-        rsync_args.extend(["-e", f"ssh -p {host.port}"])
-
-    if host.identity_file:
-        rsync_args.extend(["-e", f"ssh -i {host.identity_file}"])
+    rsync_args.extend(["-e", " ".join(ssh_options(host))])
 
     # Remote source
     remote_src = f"{host.ssh_host}:{remote_path}"
@@ -83,9 +160,18 @@ def rsync_remote_dir(
     # Local destination
     rsync_args.append(str(local_path) + "/")
 
-    print(f"  Syncing: {remote_src} -> {local_path}")
+    print(f"  Syncing: {remote_src} -> {local_path}", file=out)
 
-    result = subprocess.run(rsync_args)
+    if out is None:
+        result = subprocess.run(rsync_args)
+    else:
+        result = subprocess.run(
+            rsync_args,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True
+        )
+        out.write(result.stdout)
 
     return result.returncode == 0
 
@@ -94,32 +180,39 @@ def discover_remote_histories(host: RemoteHost) -> dict:
     """
     Discover what history directories exist on a remote host.
 
-    Returns dict with 'claude_code' and 'cursor' keys containing paths if found.
+    Returns dict with 'claude_code' and 'cursor' keys containing paths if found,
+    and an 'error' key holding ssh's message if the host could not be reached.
     """
     discoveries = {
         "claude_code": None,
-        "cursor": None
+        "cursor": None,
+        "error": None
     }
 
-    # Check for Claude Code
-    claude_paths = [
-        "~/.claude"
-    ]
-    for path in claude_paths:
-        ret, stdout, stderr = run_ssh_command(host, f"test -d {path} && echo exists")
-        if "exists" in stdout:
+    # Test every candidate in a single SSH round-trip; the echoed path is
+    # quoted so it comes back unexpanded and matches our candidate list
+    candidates = REMOTE_CLAUDE_PATHS + REMOTE_CURSOR_PATHS
+    command = "; ".join(f'test -d {path} && echo "EXISTS:{path}"' for path in candidates)
+    ret, stdout, stderr = run_ssh_command(host, command)
+
+    # ssh itself exits with 255 on connection or authentication failure
+    if ret == 255:
+        discoveries["error"] = stderr.strip() or "ssh exited with status 255"
+        return discoveries
+
+    found = {
+        line[len("EXISTS:"):]
+        for line in stdout.splitlines()
+        if line.startswith("EXISTS:")
+    }
+
+    for path in REMOTE_CLAUDE_PATHS:
+        if path in found:
             discoveries["claude_code"] = path
             break
 
-    # Check for Cursor
-    cursor_paths = [
-        "~/.cursor-server",
-        "~/.config/Cursor",
-        "~/.cursor"
-    ]
-    for path in cursor_paths:
-        ret, stdout, stderr = run_ssh_command(host, f"test -d {path} && echo exists")
-        if "exists" in stdout:
+    for path in REMOTE_CURSOR_PATHS:
+        if path in found:
             discoveries["cursor"] = path
             break
 
@@ -131,54 +224,79 @@ def pull_from_remote(
     consolidated_dir: Path,
     claude_code: bool = True,
     cursor: bool = True,
-    dry_run: bool = False
+    dry_run: bool = False,
+    out: Optional[TextIO] = None,
+    compress: bool = False
 ) -> bool:
     """
     Pull histories from a remote host.
 
+    Progress is printed to out (defaults to stdout).
+
     Creates directory structure:
         consolidated_dir/
         └── hostname/
             ├── claude-code/
             └── cursor/
     """
-    print(f"\nPulling from {host.ssh_host}")
-    print("-" * 50)
+    print(f"\nPulling from {host.ssh_host}", file=out)
+    print("-" * 50, file=out)
 
     # First discover what exists
-    print("Discovering remote histories...")
+    print("Discovering remote histories...", file=out)
     discoveries = discover_remote_histories(host)
 
+    if discoveries["error"]:
+        print(f"  Could not connect to {host.ssh_host} (connection or authentication failed):", file=out)
+        print(f"    {discoveries['error']}", file=out)
+        return False
+
     if not discoveries["claude_code"] and not discoveries["cursor"]:
-        print(f"  No histories found on {host.hostname}")
+        print(f"  No histories found on {host.hostname}", file=out)
         return False
 
     host_dir = consolidated_dir / host.hostname
     host_dir.mkdir(parents=True, exist_ok=True)
 
+    # Each tool is synced into its own renamed directory, so this uses one
+    # rsync per tool; both ride the multiplexed SSH connection opened above
     success = True
 
     # Pull Claude Code
     if claude_code and discoveries["claude_code"]:
-        print(f"\nClaude Code found at: {discoveries['claude_code']}")
+        print(f"\nClaude Code found at: {discoveries['claude_code']}", file=out)
         local_claude = host_dir / "claude-code"
 
-        if not rsync_remote_dir(host, discoveries["claude_code"] + "/", local_claude, dry_run):
-            print(f"  Failed to sync Claude Code")
+        if not rsync_remote_dir(
+            host,
+            discoveries["claude_code"] + "/",
+            local_claude,
+            dry_run,
+            out,
+            compress=compress
+        ):
+            print(f"  Failed to sync Claude Code", file=out)
             success = False
     elif claude_code:
-        print("\nClaude Code: Not found on remote")
+        print("\nClaude Code: Not found on remote", file=out)
 
     # Pull Cursor
     if cursor and discoveries["cursor"]:
-        print(f"\nCursor found at: {discoveries['cursor']}")
+        print(f"\nCursor found at: {discoveries['cursor']}", file=out)
         local_cursor = host_dir / "cursor"
 
-        if not rsync_remote_dir(host, discoveries["cursor"] + "/", local_cursor, dry_run):
-            print(f"  Failed to sync Cursor")
+        if not rsync_remote_dir(
+            host,
+            discoveries["cursor"] + "/",
+            local_cursor,
+            dry_run,
+            out,
+            compress=compress
+        ):
+            print(f"  Failed to sync Cursor", file=out)
             success = False
     elif cursor:
-        print("\nCursor: Not found on remote")
+        print("\nCursor: Not found on remote", file=out)
 
     return success
 
@@ -186,23 +304,38 @@ def pull_from_remote(
 def pull_from_multiple(
     hosts: list[RemoteHost],
     consolidated_dir: Path,
-    dry_run: bool = False
+    dry_run: bool = False,
+    compress: bool = False
 ):
     """Pull from multiple remote hosts."""
     print(f"\nPulling histories from {len(hosts)} host(s)")
     print("=" * 60)
 
-    results = {}
-    for host in hosts:
+    def pull_buffered(host: RemoteHost) -> tuple[bool, str]:
+        # Buffer per-host output so concurrent pulls don't interleave
+        buf = io.StringIO()
         try:
-            results[host.hostname] = pull_from_remote(
+            success = pull_from_remote(
                 host,
                 consolidated_dir,
-                dry_run=dry_run
+                dry_run=dry_run,
+                out=buf,
+                compress=compress
             )
         except Exception as e:
-            print(f"\nError pulling from {host.hostname}: {e}")
-            results[host.hostname] = False
+            print(f"\nError pulling from {host.hostname}: {e}", file=buf)
+            success = False
+        return success, buf.getvalue()
+
+    results = {host.hostname: False for host in hosts}
+    max_workers = max(1, min(len(hosts), MAX_PARALLEL_HOSTS))
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(pull_buffered, host): host for host in hosts}
+        for future in as_completed(futures):
+            host = futures[future]
+            results[host.hostname], output = future.result()
+            sys.stdout.write(output)
+            sys.stdout.flush()
 
     print("\n" + "=" * 60)
     print("Summary:")
@@ -244,6 +377,11 @@ if __name__ == "__main__":
         action="store_true",
         help="Show what would be synced without actually syncing"
     )
+    parser.add_argument(
+        "--compress", "-z",
+        action="store_true",
+        help="Compress rsync transfers (useful over slow WAN links)"
+    )
     parser.add_argument(
         "--no-claude",
         action="store_true",
@@ -278,7 +416,8 @@ if __name__ == "__main__":
             args.output,
             claude_code=not args.no_claude,
             cursor=not args.no_cursor,
-            dry_run=args.dry_run
+            dry_run=args.dry_run,
+            compress=args.compress
         )
     else:
-        pull_from_multiple(hosts, args.output, args.dry_run)
+        pull_from_multiple(hosts, args.output, args.dry_run, compress=args.compress)